@@ -1,103 +1,62 @@
 #!/usr/bin/env python
 import os
+import io
+import sys
 import json
+import asyncio
+import collections
+import copy
 import re
 import hashlib
-import subprocess
+import mmap
+import difflib
+import functools
 import shutil
+import stat
 import glob
-import uuid
-import sqlite3
-import platform
-import socket
+import fnmatch
+import secrets
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any, Generator
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from enum import Enum
 
 # Rich imports for UI
 from rich.console import Console
 from rich.panel import Panel
-from rich.syntax import Syntax
-from rich.markdown import Markdown
 from rich.prompt import Prompt, Confirm
 from rich.table import Table
 from rich.text import Text
-from rich.live import Live
-from rich.spinner import Spinner
-from rich.layout import Layout
-from rich.align import Align
-from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn
-from rich.tree import Tree
-
-# Prompt Toolkit imports for advanced CLI features
-from prompt_toolkit import prompt
-from prompt_toolkit.styles import Style
-from prompt_toolkit.formatted_text import HTML
-from prompt_toolkit.key_binding import KeyBindings
-from prompt_toolkit.history import FileHistory
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.completion import PathCompleter, WordCompleter
+
+# prompt_toolkit (the interactive prompt) and .providers (requests) are imported by the
+# functions that use them, so the welcome screen renders before they load
+
+# Optional SIMD-accelerated hashing (pip install osram-cli[speedups])
+try:
+    import blake3
+except ImportError:
+    blake3 = None
 
 # Import local modules
-from .providers import PROVIDERS, call_api, AVAILABLE_MODELS
-from .utils import load_config, save_config, setup_database
+from .utils import load_config, save_config, json_loads, estimate_tokens_batch, env_number
 
 # Initialize console
 console = Console()
 
-# Logo ASCII for Osram
-LOGO = """
-..........................................................................................................
-..........................................................................................................
-.........................................-+#%%%#=:......:-*%%%#+-.........................................
-.......................................-#%%%%%%%%%+:...+%%%%%%%%%#-.......................................
-......................................-%%%#-:::+%%%+..+%%%*-::-#%%%-......................................
-......................................*%%#:.....+%%#:.#%%+.....:#%%#......................................
-......................................*%%%-.....-%%%:.%%%=.....-%%%*......................................
-.......................................#%%%%#=..=%%%:.%%%=..=#%%%%#.......................................
-........................................=*%%%=..=%%%==%%%+..=%%%*=........................................
-.............................................-+#%%%%%%%%%%#*-.............................................
-..........................................:#%%%%%%%%%%%%%%%%%%#-..........................................
-........................................:*%%%%%*-........:+#%%%%#:........................................
-.......................................=%%%%*-....:--=-:....:+%%%%=.......................................
-......................................-%%%#-....:*%%%%%%#+....:#%%%=......................................
-.....................................:%%%#:....=%%%%*+#%%%*....:#%%%:.....................................
-.....................................=%%%=.....#%%#:...+%%%-....=%%%+.....................................
-.....................................+%%#=.....+%%%=..:*%%#-....-#%%+.....................................
-.....................................=%%%=......+%%%%+#%%%=.....=%%%=.....................................
-.....................................:#%%#-......-#%%%%%*:.....:#%%%:.....................................
-......................................:%%%%*:...:=#%%%%%#=...:+%%%%:......................................
-.......................................:*%%%%%%%%%%%%#%%%%%%%%%%%*:.......................................
-.........................................:*#%%%%%#*:...=#%%%%%#*:.........................................
-..............................................::...........:..............................................
-..................................................-*###*-.................................................
-.................................................#%%%%%%%#................................................
-................................................+%%*:.:#%%+...............................................
-................................................+%%#-:-#%%=...............................................
-.................................................*%%%%%%%*................................................
-..................................................:+*#*=:.................................................
-..........................................................................................................
-..........................................................................................................
-..........................................................................................................
-.................:--:......................................................::::...........................
-..............=#%%%%%%*:................................................+#%%%%%#=..*%#......:#%+..........
-............:*%#=:..:+%%=...-=+=:..:--.==:.:=++-...:=-.=+=..-++:......-#%#-...-#%+.*%#......:#%+..........
-............+%%-......+%%:=#%#*#%*.+%%%%*-#%#*#%%=.+%%%%%%%%%%%%*:....*%%:.........+%#......:#%+..........
-............+%%:......+%%-=%%*=-:..+%%:....:---#%*.+%%:.:#%*..-%#-...:*%%..........+%#......:#%+..........
-............-#%*.....-#%#..:=+*%%*.+%#...-#%+==#%*.+%%:..#%+..-%#-....=%%+.....=+=.+%#......:*%+..........
-.............-%%#*++#%%*:.=##=-*%%:+%#...=%%+-+%%*.+%%:..#%+..-%#-.....=%%#*+*#%#-.+%%+++++-:*%+..........
-...............:+#%%*=:....-*%%#=..=#+....-#%#==*+.=**...+*=..:*+:.......-+###+-...=*******-:+*-..........
-..........................................................................................................
-..........................................................................................................
-
-                       Multi-provider AI Assistant                     ║
-   
-"""
+# Logo ASCII for Osram, kept in logo.txt and rendered once per process
+@functools.lru_cache(maxsize=1)
+def _get_logo_renderable() -> Text:
+    """Load the logo and build its Rich Text once"""
+    logo = Path(__file__).with_name("logo.txt").read_text(encoding="utf-8")
+    return Text(logo, no_wrap=True, overflow="crop")
 
 # Global variables
+# Cached working directory; only refreshed after our own os.chdir calls
 current_directory = os.getcwd()
+# The home directory does not change during a session
+_HOME = str(Path.home())
 file_operation_results = {}
 analysis_state = {
     "current_task": None,
@@ -106,22 +65,32 @@ analysis_state = {
     "errors": [],
     "project_analysis": None
 }
-user_session = {
-    "session_id": str(uuid.uuid4()),
-    "start_time": datetime.now(),
-    "operations_count": 0,
-    "errors_count": 0,
-    "total_tokens_used": 0,
-    "actions_performed": [],
-    "trusted_directories": set()
-}
+# Created on first use by get_user_session() to keep import cheap
+user_session = None
+# Per-operation records are capped (the total keeps counting); timestamps are formatted only for /tokens
+_MAX_TOKEN_OPERATIONS = 1000
 token_usage = {
     "total_tokens": 0,
-    "operations": []
+    "operations": collections.deque(maxlen=_MAX_TOKEN_OPERATIONS)
 }
 navigation_history = []
 history_index = -1
 
+def get_user_session() -> Dict[str, Any]:
+    """Return the session state, creating it on first use"""
+    global user_session
+    if user_session is None:
+        user_session = {
+            "session_id": secrets.token_hex(16),
+            "start_time": datetime.now(),
+            "operations_count": 0,
+            "errors_count": 0,
+            "total_tokens_used": 0,
+            "actions_performed": [],
+            "trusted_directories": set()
+        }
+    return user_session
+
 # Data classes for structured data
 @dataclass
 class FileOperation:
@@ -176,15 +145,6 @@ class AnalysisType(Enum):
     DOCUMENTATION = "documentation"
     TESTS = "tests"
 
-# Initialize database on import
-setup_database()
-
-# Style for prompt_toolkit
-style = Style.from_dict({
-    'prompt': 'green',
-    'bottom-toolbar': 'reverse',
-})
-
 def main():
     """Main function to start the Osram CLI assistant"""
     # Display welcome screen
@@ -193,19 +153,16 @@ def main():
     # Start chat session
     start_chat_session()
 
+def _display_path(path: str) -> str:
+    """Abbreviate the home directory prefix of path to ~"""
+    if path == _HOME or path.startswith(_HOME + os.sep):
+        return "~" + path[len(_HOME):]
+    return path
+
 def display_welcome_screen():
     """Display welcome screen with directory information"""
-    console.print(LOGO)
-    
-    # Get current directory
-    current_dir = os.getcwd()
-    home_dir = str(Path.home())
-    
-    # Shorten home directory path for display
-    if current_dir.startswith(home_dir):
-        display_dir = "~" + current_dir[len(home_dir):]
-    else:
-        display_dir = current_dir
+    # Current directory, shortened for display
+    display_dir = _display_path(current_directory)
     
     # Create welcome panel
     welcome_text = f"""
@@ -222,10 +179,18 @@ Type your requests in natural language. For example:
 Type [bold]/help[/bold] for help or [bold]/exit[/bold] to quit.
 """
     
-    console.print(Panel(welcome_text, title="Osram CLI", border_style="green"))
+    # Logo and panel go out in one render
+    console.print(_get_logo_renderable(), Panel(welcome_text, title="Osram CLI", border_style="green"))
 
 def start_chat_session():
     """Start the chat session with the AI assistant"""
+    from prompt_toolkit import prompt
+    from prompt_toolkit.styles import Style
+    from prompt_toolkit.key_binding import KeyBindings
+    from prompt_toolkit.history import FileHistory
+    from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+    from .providers import prewarm_session
+    
     # Load configuration
     config = load_config()
     current_provider = config.get("current_provider", "zai")
@@ -241,9 +206,18 @@ def start_chat_session():
             console.print("[red]Please configure an API key to use the AI assistant.[/red]")
             return
     
+    # Connect to the provider while the user types the first message
+    prewarm_session(current_provider, config["providers"][current_provider].get("endpoint", ""))
+    
+    # Style for prompt_toolkit
+    style = Style.from_dict({
+        'prompt': 'green',
+        'bottom-toolbar': 'reverse',
+    })
+    
     # Initialize chat history
-    history_file = Path.home() / ".osram_chat_history"
-    history = FileHistory(str(history_file))
+    history_file = os.path.join(_HOME, ".osram_chat_history")
+    history = FileHistory(history_file)
     
     # Key bindings
     bindings = KeyBindings()
@@ -301,20 +275,10 @@ def start_chat_session():
             )
             
             # Check for special commands
-            if user_input.lower() == "/exit":
-                console.print("[bold green]Session ended. Goodbye![/bold green]")
-                break
-            elif user_input.lower() == "/help":
-                show_help()
-                continue
-            elif user_input.lower() == "/settings":
-                show_settings()
-                continue
-            elif user_input.lower() == "/tokens":
-                display_token_usage()
-                continue
-            elif user_input.lower() == "/configure":
-                configure_provider()
+            handler = COMMAND_HANDLERS.get(user_input.strip().lower())
+            if handler is not None:
+                if handler() == "exit":
+                    break
                 continue
             
             # Add user message to conversation
@@ -323,15 +287,17 @@ def start_chat_session():
             # Process user input and get response
             response = process_user_input_with_ai(user_input, messages, current_provider)
             
-            # Add AI response to conversation
-            messages.append({"role": "assistant", "content": response})
+            # Add AI response to conversation (raw action output is shortened; it is re-sent every turn)
+            messages.append({"role": "assistant", "content": _history_content(response)})
             
-            # Display response
+            # Display response: only the prefix goes through Rich, the model text is written as-is
             console.print(f"[bold green]AI ({current_provider}):[/bold green]")
-            console.print(response)
+            sys.stdout.write(response)
+            sys.stdout.write("\n")
+            sys.stdout.flush()
             
             # Track token usage
-            track_tokens("chat", estimate_tokens(user_input + response))
+            track_tokens("chat", estimate_tokens_batch((user_input, response)))
             
         except KeyboardInterrupt:
             console.print("\n[bold yellow]Use /exit to quit.[/bold yellow]")
@@ -339,8 +305,20 @@ def start_chat_session():
             console.print("\n[bold green]Session ended. Goodbye![/bold green]")
             break
 
-def show_help():
-    """Show help information"""
+# Action results (file contents, command output) kept in the chat history are cut to this many
+# characters; the full result is still printed
+_MAX_ACTION_HISTORY_CHARS = 2000
+
+def _history_content(response: str) -> str:
+    """Return the text to keep in the conversation history for a response"""
+    if response.startswith("Action completed: ") and len(response) > _MAX_ACTION_HISTORY_CHARS:
+        omitted = len(response) - _MAX_ACTION_HISTORY_CHARS
+        return f"{response[:_MAX_ACTION_HISTORY_CHARS]}\n[... {omitted} characters of output shown to the user but omitted here ...]"
+    return response
+
+@functools.lru_cache(maxsize=1)
+def _get_help_panel() -> Panel:
+    """Parse the help markup into a Panel once; the text never changes"""
     help_text = """
 [bold]Available Commands:[/bold]
 
@@ -360,7 +338,11 @@ def show_help():
 - "Find all Python files in this directory"
 - "Show me the directory structure"
 """
-    console.print(Panel(help_text, title="Help", border_style="blue"))
+    return Panel(Text.from_markup(help_text), title="Help", border_style="blue")
+
+def show_help():
+    """Show help information"""
+    console.print(_get_help_panel())
 
 def show_settings():
     """Show current settings"""
@@ -385,15 +367,19 @@ def show_settings():
 
 def configure_provider():
     """Configure provider settings with connection test"""
+    from .providers import call_api, AVAILABLE_MODELS
+    
     console.print("[bold]Configure Provider Settings[/bold]")
     
-    config = load_config()
+    # Edited on a copy: the cached config is shared and only changes through save_config
+    config = copy.deepcopy(load_config())
     
-    # List available providers
-    console.print("\n[bold]Available providers:[/bold]")
+    # List available providers (rendered in a single print)
+    lines = ["\n[bold]Available providers:[/bold]"]
     for i, provider in enumerate(config["providers"].keys(), 1):
         current_marker = " (current)" if provider == config.get("current_provider") else ""
-        console.print(f"{i}. {provider}{current_marker}")
+        lines.append(f"{i}. {provider}{current_marker}")
+    console.print("\n".join(lines))
     
     # Get provider choice
     provider_choice = Prompt.ask("Select a provider", choices=list(config["providers"].keys()))
@@ -407,11 +393,11 @@ def configure_provider():
     
     # List available models for the provider
     if provider_choice in AVAILABLE_MODELS:
-        console.print(f"\n[bold]Available models for {provider_choice}:[/bold]")
-        for model in AVAILABLE_MODELS[provider_choice]:
-            console.print(f"- {model}")
+        lines = [f"\n[bold]Available models for {provider_choice}:[/bold]"]
+        lines.extend(f"- {model}" for model in AVAILABLE_MODELS[provider_choice])
+        console.print("\n".join(lines))
         
-        model_choice = Prompt.ask("Select a model", choices=AVAILABLE_MODELS[provider_choice])
+        model_choice = Prompt.ask("Select a model", choices=list(AVAILABLE_MODELS[provider_choice]))
         config["providers"][provider_choice]["model"] = model_choice
     
     # Save config
@@ -432,18 +418,83 @@ def configure_provider():
 
 def get_prompt_with_directory(provider):
     """Get prompt with current directory displayed"""
-    current_dir = get_current_directory()
-    # Shorten home directory path
-    home = str(Path.home())
-    if current_dir.startswith(home):
-        display_dir = "~" + current_dir[len(home):]
-    else:
-        display_dir = current_dir
+    from prompt_toolkit.formatted_text import HTML
+    
+    display_dir = _display_path(current_directory)
     
     return HTML(f"<ansiblue>You</ansiblue> ({provider}) <ansigreen>{display_dir}</ansigreen>: ")
 
+# Markdown code fences models often wrap JSON answers in
+_CODE_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*$', re.MULTILINE | re.IGNORECASE)
+_JSON_DECODER = json.JSONDecoder()
+
+def _parse_action_json(text: str) -> Dict[str, Any]:
+    """Parse the model's action plan, tolerating code fences and text around the JSON object"""
+    try:
+        return json_loads(text)
+    except json.JSONDecodeError:
+        pass
+    text = _CODE_FENCE_RE.sub('', text)
+    # Decode from each "{" in turn; raw_decode stops at the end of the object, ignoring what follows
+    idx = text.find('{')
+    while idx != -1:
+        try:
+            obj = _JSON_DECODER.raw_decode(text, idx)[0]
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError:
+            pass
+        idx = text.find('{', idx + 1)
+    raise json.JSONDecodeError("No JSON object found", text, 0)
+
+# Unambiguous, read-only commands that are dispatched without asking the model to classify
+# them first; anything else (including destructive actions) goes through the analysis prompt
+_PATH_ARG = r'([^\s~-]\S*)'
+
+def _if_exists(path, action):
+    """Return action only when path exists, so phrases like "list dependencies" reach the model"""
+    return action if os.path.lexists(_abspath(path)) else None
+
+_FAST_INTENTS = (
+    (re.compile(r'(?:ls|dir|list(?: files)?)(?:\s+' + _PATH_ARG + r')?', re.IGNORECASE),
+     lambda m: _if_exists(m.group(1) or ".", ("list_files", {"path": m.group(1) or "."}))),
+    (re.compile(r'(?:cat|read)\s+' + _PATH_ARG, re.IGNORECASE),
+     lambda m: _if_exists(m.group(1), ("read_file", {"file_path": m.group(1)}))),
+    (re.compile(r'cd\s+' + _PATH_ARG, re.IGNORECASE),
+     lambda m: _if_exists(m.group(1), ("change_directory", {"path": m.group(1)}))),
+    (re.compile(r'find\s+(\S*[*?.]\S*)(?:\s+in\s+' + _PATH_ARG + r')?', re.IGNORECASE),
+     lambda m: _if_exists(m.group(2) or ".", ("find_files", {"pattern": m.group(1), "directory": m.group(2) or "."}))),
+    (re.compile(r'git\s+(status|log|diff|branch)', re.IGNORECASE),
+     lambda m: ("git_operation", {"operation": m.group(1).lower()})),
+    (re.compile(r'analy[sz]e(?:\s+(?:this\s+)?project)?', re.IGNORECASE),
+     lambda m: ("analyze_project", {})),
+)
+
+def _match_fast_intent(user_input: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Return (action_type, parameters) when the input is an obvious command, else None"""
+    text = user_input.strip()
+    for regex, build in _FAST_INTENTS:
+        match = regex.fullmatch(text)
+        if match is not None:
+            # A builder returns None when its argument does not name an existing path
+            return build(match)
+    return None
+
+def _call_api_with_system_prompt(messages: List[Dict[str, str]], prompt_text: str, provider_name: str):
+    """Call the API with a trailing system prompt, appended in place rather than copying the history"""
+    from .providers import call_api
+    
+    messages.append({"role": "system", "content": prompt_text})
+    try:
+        # call_api serializes the request body before returning the response stream
+        return call_api(messages, provider_name=provider_name)
+    finally:
+        messages.pop()
+
 def process_user_input_with_ai(user_input: str, messages: List[Dict[str, str]], current_provider: str) -> str:
     """Process user input with AI assistance and robust error handling"""
+    from .providers import call_api
+    
     # First, let the AI analyze the user's request
     analysis_prompt = f"""
     Analyze the user's request and determine what action needs to be taken:
@@ -461,19 +512,19 @@ def process_user_input_with_ai(user_input: str, messages: List[Dict[str, str]],
     }}
     """
     
-    # Add analysis prompt to messages
-    analysis_messages = messages + [{"role": "system", "content": analysis_prompt}]
-    
-    # Get AI analysis
     try:
-        response_stream = call_api(analysis_messages, provider_name=current_provider)
+        # Obvious commands skip the intent-analysis round-trip to the model
+        fast_action = _match_fast_intent(user_input)
+        if fast_action is not None:
+            return f"Action completed: {execute_action(*fast_action)}"
+        
+        # Get AI analysis
+        response_stream = _call_api_with_system_prompt(messages, analysis_prompt, current_provider)
         
         if response_stream is None:
             return "I'm sorry, I'm having trouble connecting to the AI service. Please check your API key and try again."
         
-        analysis_response = ""
-        for chunk in response_stream:
-            analysis_response += chunk
+        analysis_response = "".join(response_stream)
         
         # If we didn't get a proper response, return an error message
         if not analysis_response.strip():
@@ -481,7 +532,7 @@ def process_user_input_with_ai(user_input: str, messages: List[Dict[str, str]],
         
         # Parse JSON response
         try:
-            action_data = json.loads(analysis_response)
+            action_data = _parse_action_json(analysis_response)
             action_type = action_data.get("action_type")
             parameters = action_data.get("parameters", {})
             requires_ai_response = action_data.get("requires_ai_response", True)
@@ -507,15 +558,12 @@ def process_user_input_with_ai(user_input: str, messages: List[Dict[str, str]],
                 """
                 
                 try:
-                    response_messages = messages + [{"role": "system", "content": response_prompt}]
-                    response_stream = call_api(response_messages, provider_name=current_provider)
+                    response_stream = _call_api_with_system_prompt(messages, response_prompt, current_provider)
                     
                     if response_stream is None:
                         return f"Action completed: {result}\n\nHowever, I'm having trouble generating a detailed response."
                     
-                    ai_response = ""
-                    for chunk in response_stream:
-                        ai_response += chunk
+                    ai_response = "".join(response_stream)
                     
                     return ai_response
                 except Exception as e:
@@ -531,9 +579,7 @@ def process_user_input_with_ai(user_input: str, messages: List[Dict[str, str]],
                 if response_stream is None:
                     return "I'm sorry, I'm having trouble connecting to the AI service. Please check your API key and try again."
                 
-                response = ""
-                for chunk in response_stream:
-                    response += chunk
+                response = "".join(response_stream)
                 
                 return response
             except Exception as e:
@@ -645,78 +691,174 @@ def execute_action(action_type: str, parameters: Dict[str, Any]) -> str:
         return "Error: Unknown action type."
 
 # File Operations Functions
+@functools.lru_cache(maxsize=1024)
+def _norm(path: str) -> str:
+    """Cached os.path.normpath"""
+    return os.path.normpath(path)
+
+def _abspath(path) -> str:
+    """os.path.abspath with the normalization step cached"""
+    path = os.fspath(path)
+    if not os.path.isabs(path):
+        path = os.path.join(current_directory, path)
+    return _norm(path)
+
+def _safe_join(base, user_path) -> str:
+    """Join user_path onto base, rejecting paths whose real location escapes base"""
+    path = _norm(os.path.join(base, os.fspath(user_path)))
+    real_base = os.path.realpath(base)
+    # Resolve the parent only, so a symlink itself (not its target) is what gets checked
+    resolved = os.path.join(os.path.realpath(os.path.dirname(path)), os.path.basename(path))
+    if resolved != real_base and not resolved.startswith(real_base.rstrip(os.sep) + os.sep):
+        raise ValueError(f"Path '{path}' is outside of '{real_base}'")
+    return path
+
+def _safe_destination(source, destination) -> str:
+    """_safe_join for a copy/move target, also checking the entry created inside a destination directory"""
+    destination = _safe_join(current_directory, destination)
+    if os.path.isdir(destination):
+        # Through a symlinked directory the new entry could still land outside the cwd
+        _safe_join(current_directory, os.path.join(destination, os.path.basename(source)))
+    return destination
+
+# Files larger than this are shown truncated by read_file_content_real
+MAX_READ_BYTES = env_number("OSRAM_MAX_READ_BYTES", 8 * 1024 * 1024)
+
 def list_directory_contents_real(path="."):
     """List real directory contents"""
     try:
-        path = os.path.abspath(path)
+        path = _abspath(path)
         
-        if not os.path.exists(path):
+        # A single stat answers both "exists" and "is a directory"
+        try:
+            st = os.stat(path)
+        except OSError:
             return f"Error: Path '{path}' does not exist."
         
-        if not os.path.isdir(path):
+        if not stat.S_ISDIR(st.st_mode):
             return f"Error: '{path}' is not a directory."
         
-        items = os.listdir(path)
-        result = [f"Contents of directory: {path}\n"]
+        # Build the listing in a single buffer; each entry is preceded by its newline
+        buf = io.StringIO()
+        write = buf.write
+        write(f"Contents of directory: {path}\n")
         
-        for item in items:
-            item_path = os.path.join(path, item)
-            try:
-                stat = os.stat(item_path)
-                if os.path.isdir(item_path):
-                    result.append(f"📁 {item}/")
-                else:
-                    size = stat.st_size
-                    modified = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M")
-                    result.append(f"📄 {item} ({size} bytes, modified: {modified})")
-            except Exception as e:
-                result.append(f"❌ {item} (error: {str(e)})")
+        # scandir gives the entry type from the directory read; only files need a stat
+        with os.scandir(path) as it:
+            for entry in it:
+                item = entry.name
+                try:
+                    if entry.is_dir():
+                        write(f"\n📁 {item}/")
+                    else:
+                        st = entry.stat()
+                        size = st.st_size
+                        modified = datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M")
+                        write(f"\n📄 {item} ({size} bytes, modified: {modified})")
+                except Exception as e:
+                    write(f"\n❌ {item} (error: {str(e)})")
         
-        return "\n".join(result)
+        return buf.getvalue()
     except Exception as e:
         return f"Error listing directory: {str(e)}"
 
 def read_file_content_real(file_path):
     """Read file content"""
     try:
-        file_path = os.path.abspath(file_path)
+        file_path = _abspath(file_path)
         
-        if not os.path.exists(file_path):
+        try:
+            st = os.stat(file_path)
+        except OSError:
             return f"Error: File '{file_path}' does not exist."
         
-        if not os.path.isfile(file_path):
+        if not stat.S_ISREG(st.st_mode):
             return f"Error: '{file_path}' is not a file."
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # One open serves the size check, the binary sniff and the read itself
+        with open(file_path, 'rb', buffering=1 << 20) as f:
+            size = os.fstat(f.fileno()).st_size
+            
+            # Sniff the first 4 KiB for NUL bytes to detect binary files
+            head = f.read(4096)
+            if b'\x00' in head:
+                return f"File '{file_path}' appears to be binary ({size} bytes); content not shown."
+            
+            if size > MAX_READ_BYTES:
+                # Only keep the beginning and the end of very large files
+                half = MAX_READ_BYTES // 2
+                start = head[:half] + f.read(max(0, half - len(head)))
+                f.seek(-half, os.SEEK_END)
+                end = f.read(half)
+                parts = [
+                    start.decode('utf-8', errors='replace'),
+                    f"\n\n... truncated {size - 2 * half} bytes ...\n\n",
+                    end.decode('utf-8', errors='replace')
+                ]
+            else:
+                f.seek(0)
+                parts = [io.TextIOWrapper(f, encoding='utf-8', errors='replace').read()]
         
-        return f"Content of file: {file_path}\n\n{content}"
+        return "".join([f"Content of file: {file_path}\n\n", *parts])
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
 def write_file_content(file_path, content, auto_confirm=False):
     """Write content to a file"""
     try:
-        file_path = os.path.abspath(file_path)
+        file_path = _safe_join(current_directory, file_path)
         
         # Ask for confirmation if not auto-confirm
         if not auto_confirm and not Confirm.ask(f"[yellow]Are you sure you want to write to {file_path}?[/yellow]"):
             return "Operation cancelled by user."
         
-        # Create backup if file exists
-        if os.path.exists(file_path):
-            backup_path = f"{file_path}.bak"
-            shutil.copy2(file_path, backup_path)
-        
         # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        parent_dir = os.path.dirname(file_path)
+        if parent_dir:
+            os.makedirs(parent_dir, exist_ok=True)
+        
+        try:
+            st = os.lstat(file_path)
+        except FileNotFoundError:
+            st = None
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        backup_path = None
+        if st is not None and (stat.S_ISLNK(st.st_mode) or st.st_nlink > 1):
+            # Replacing the path would turn a symlink into a regular file or split a hardlink,
+            # so back up with a real copy and write through the existing inode instead
+            if os.path.exists(file_path):
+                backup_path = f"{file_path}.bak"
+                if os.path.lexists(backup_path):
+                    os.remove(backup_path)
+                shutil.copy2(file_path, backup_path)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+        else:
+            # Write to a sibling temp file first so the target is replaced atomically
+            tmp_path = f"{file_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                
+                # Back up the existing file with a hardlink (no data copy), copying only across devices
+                if st is not None:
+                    backup_path = f"{file_path}.bak"
+                    if os.path.lexists(backup_path):
+                        os.remove(backup_path)
+                    try:
+                        os.link(file_path, backup_path)
+                    except OSError:
+                        shutil.copy2(file_path, backup_path)
+                    shutil.copymode(file_path, tmp_path)
+                
+                os.replace(tmp_path, file_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
         
         result = f"Successfully wrote to file: {file_path}"
-        if os.path.exists(f"{file_path}.bak"):
-            result += f"\nBackup saved as: {file_path}.bak"
+        if backup_path:
+            result += f"\nBackup saved as: {backup_path}"
         
         return result
     except Exception as e:
@@ -725,7 +867,7 @@ def write_file_content(file_path, content, auto_confirm=False):
 def create_directory(dir_path, auto_confirm=False):
     """Create a new directory"""
     try:
-        dir_path = os.path.abspath(dir_path)
+        dir_path = _abspath(dir_path)
         
         # Ask for confirmation if not auto-confirm
         if not auto_confirm and not Confirm.ask(f"[yellow]Are you sure you want to create directory {dir_path}?[/yellow]"):
@@ -739,7 +881,7 @@ def create_directory(dir_path, auto_confirm=False):
 def delete_file_or_path(path, auto_confirm=False):
     """Delete a file or directory"""
     try:
-        path = os.path.abspath(path)
+        path = _safe_join(current_directory, path)
         
         if not os.path.exists(path):
             return f"Error: Path '{path}' does not exist."
@@ -749,40 +891,66 @@ def delete_file_or_path(path, auto_confirm=False):
             return "Operation cancelled by user."
         
         # Move to trash instead of permanent delete
-        trash_path = Path.home() / ".osram_cli" / "trash"
-        trash_path.mkdir(exist_ok=True)
+        trash_path = Path(_HOME, ".osram_cli", "trash")
+        trash_path.mkdir(parents=True, exist_ok=True)
         
-        dest_path = trash_path / os.path.basename(path)
-        counter = 1
-        while dest_path.exists():
-            stem = dest_path.stem
-            suffix = dest_path.suffix
-            dest_path = trash_path / f"{stem}_{counter}{suffix}"
-            counter += 1
+        # A nanosecond timestamp suffix makes the trash name unique without probing
+        dest_path = trash_path / f"{os.path.basename(path)}.{time.time_ns():x}"
         
-        shutil.move(path, dest_path)
+        if os.lstat(path).st_dev == os.stat(trash_path).st_dev:
+            # Same filesystem: a single atomic rename
+            os.rename(path, dest_path)
+        else:
+            shutil.move(path, dest_path)
         
         return f"Moved to trash: {path} -> {dest_path}"
     except Exception as e:
         return f"Error deleting path: {str(e)}"
 
+def _fast_copy(src, dst):
+    """shutil.copy2 replacement that lets the kernel copy (or reflink) the data via copy_file_range"""
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    # Opening dst for writing would truncate src before a single byte is copied
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            # On btrfs/XFS this clones extents instead of copying bytes
+            copied = 0
+            while True:
+                n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30)
+                if not n:
+                    break
+                copied += n
+            # Some filesystems (procfs, sysfs, some FUSE mounts) report EOF straight away
+            if not copied and os.fstat(fsrc.fileno()).st_size:
+                raise OSError("copy_file_range copied nothing")
+    except (AttributeError, OSError):
+        # No copy_file_range (non-Linux, Python < 3.8) or unsupported across these filesystems
+        return shutil.copy2(src, dst)
+    shutil.copystat(src, dst)
+    return dst
+
 def copy_file(source, destination, auto_confirm=False):
     """Copy a file or directory"""
     try:
-        source = os.path.abspath(source)
-        destination = os.path.abspath(destination)
+        source = _abspath(source)
+        destination = _safe_destination(source, destination)
         
-        if not os.path.exists(source):
+        try:
+            source_st = os.stat(source)
+        except OSError:
             return f"Error: Source '{source}' does not exist."
         
         # Ask for confirmation if not auto-confirm
         if not auto_confirm and not Confirm.ask(f"[yellow]Are you sure you want to copy {source} to {destination}?[/yellow]"):
             return "Operation cancelled by user."
         
-        if os.path.isdir(source):
-            shutil.copytree(source, destination)
+        if stat.S_ISDIR(source_st.st_mode):
+            shutil.copytree(source, destination, copy_function=_fast_copy)
         else:
-            shutil.copy2(source, destination)
+            _fast_copy(source, destination)
         
         return f"Successfully copied: {source} -> {destination}"
     except Exception as e:
@@ -791,8 +959,8 @@ def copy_file(source, destination, auto_confirm=False):
 def move_file(source, destination, auto_confirm=False):
     """Move a file or directory"""
     try:
-        source = os.path.abspath(source)
-        destination = os.path.abspath(destination)
+        source = _safe_join(current_directory, source)
+        destination = _safe_destination(source, destination)
         
         if not os.path.exists(source):
             return f"Error: Source '{source}' does not exist."
@@ -801,67 +969,151 @@ def move_file(source, destination, auto_confirm=False):
         if not auto_confirm and not Confirm.ask(f"[yellow]Are you sure you want to move {source} to {destination}?[/yellow]"):
             return "Operation cancelled by user."
         
-        shutil.move(source, destination)
+        # A move to a new name on the same filesystem is a single rename(2); shutil.move
+        # handles moving into a directory and copies across filesystems (EXDEV),
+        # through the kernel-side _fast_copy
+        try:
+            if os.path.lexists(destination):
+                raise FileExistsError(destination)
+            os.rename(source, destination)
+        except OSError:
+            shutil.move(source, destination, copy_function=_fast_copy)
         return f"Successfully moved: {source} -> {destination}"
     except Exception as e:
         return f"Error moving file: {str(e)}"
 
+# Compiled fnmatch patterns, keyed by the raw pattern
+_PATTERN_CACHE = {}
+
+def _compile_pattern(pattern):
+    """Translate a shell pattern to a compiled regex once per unique pattern"""
+    regex = _PATTERN_CACHE.get(pattern)
+    if regex is None:
+        regex = _PATTERN_CACHE[pattern] = re.compile(fnmatch.translate(os.path.normcase(pattern)))
+    return regex
+
+@functools.lru_cache(maxsize=256)
+def _find_files_cached(pattern, directory, mtime_ns):
+    """(path, is_dir) matches for a flat pattern; mtime_ns invalidates the entry when the directory changes"""
+    match = _compile_pattern(pattern).match
+    # Like glob, wildcards don't match hidden names unless the pattern starts with a dot
+    include_hidden = pattern.startswith('.')
+    normcase = os.path.normcase
+    with os.scandir(directory) as it:
+        return tuple(
+            (entry.path, entry.is_dir())
+            for entry in it
+            if (include_hidden or not entry.name.startswith('.')) and match(normcase(entry.name))
+        )
+
+def _path_match(path):
+    """(path, is_dir, size) for a path produced by globbing, from a single stat"""
+    st = os.stat(path)
+    is_dir = stat.S_ISDIR(st.st_mode)
+    return path, is_dir, None if is_dir else st.st_size
+
+def _glob_matches(pattern, directory):
+    """Return (path, is_dir, size) tuples matching pattern under directory, cached for single-level patterns"""
+    if '**' in pattern:
+        # glob walks the tree with os.scandir and, unlike pathlib, does not descend into
+        # hidden directories such as .git or .venv
+        return [_path_match(p) for p in glob.iglob(os.path.join(directory, pattern), recursive=True)]
+    if os.sep in pattern or (os.altsep and os.altsep in pattern):
+        # The directory mtime does not reflect changes in subdirectories
+        return [_path_match(p) for p in glob.iglob(os.path.join(directory, pattern))]
+    # Sizes are not cached: writing to a file does not change its directory's mtime
+    return [
+        (path, is_dir, None if is_dir else os.stat(path).st_size)
+        for path, is_dir in _find_files_cached(pattern, directory, os.stat(directory).st_mtime_ns)
+    ]
+
 def find_files(pattern, directory="."):
     """Find files matching a pattern"""
     try:
-        directory = os.path.abspath(directory)
+        directory = _abspath(directory)
         
-        matches = glob.glob(os.path.join(directory, pattern))
+        matches = _glob_matches(pattern, directory)
         if not matches:
             return f"No files found matching pattern: {pattern} in directory: {directory}"
         
-        result = [f"Files matching pattern '{pattern}' in directory '{directory}':"]
-        for match in matches:
-            if os.path.isdir(match):
-                result.append(f"📁 {match}/")
+        buf = io.StringIO()
+        write = buf.write
+        write(f"Files matching pattern '{pattern}' in directory '{directory}':")
+        for match, is_dir, size in matches:
+            if is_dir:
+                write(f"\n📁 {match}/")
             else:
-                size = os.path.getsize(match)
-                result.append(f"📄 {match} ({size} bytes)")
+                write(f"\n📄 {match} ({size} bytes)")
         
-        return "\n".join(result)
+        return buf.getvalue()
     except Exception as e:
         return f"Error finding files: {str(e)}"
 
+def _new_hasher():
+    """Return a BLAKE3 hasher when the optional blake3 package is installed, else BLAKE2b"""
+    if blake3 is not None:
+        return blake3.blake3()
+    return hashlib.blake2b(digest_size=16)
+
+# Below this size the fixed cost of mmap outweighs the saved copies
+_MMAP_MIN_SIZE = 64 * 1024
+
+def _file_digest(path):
+    """Hash a file, via a zero-copy mmap for large files and one reused buffer otherwise"""
+    h = _new_hasher()
+    with open(path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= _MMAP_MIN_SIZE:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+        else:
+            # readinto fills the same buffer each pass; the memoryview slice hashes it without a copy
+            buf = bytearray(max(size, 1))
+            with memoryview(buf) as view:
+                while True:
+                    n = f.readinto(buf)
+                    if not n:
+                        break
+                    h.update(view[:n])
+    return h.digest()
+
 def compare_files(file1, file2):
     """Compare two files"""
     try:
-        file1 = os.path.abspath(file1)
-        file2 = os.path.abspath(file2)
+        file1 = _abspath(file1)
+        file2 = _abspath(file2)
         
-        if not os.path.exists(file1):
+        # One stat per file covers both the existence check and the size comparison
+        try:
+            size1 = os.stat(file1).st_size
+        except OSError:
             return f"Error: File '{file1}' does not exist."
         
-        if not os.path.exists(file2):
+        try:
+            size2 = os.stat(file2).st_size
+        except OSError:
             return f"Error: File '{file2}' does not exist."
         
-        with open(file1, 'r', encoding='utf-8') as f1:
-            content1 = f1.readlines()
+        # Identical bytes (the common case) need no line-level work at all
+        if size1 == size2 and _file_digest(file1) == _file_digest(file2):
+            return "Files are identical"
         
-        with open(file2, 'r', encoding='utf-8') as f2:
-            content2 = f2.readlines()
+        # Split lines on the raw bytes (a C-level newline scan) and decode only the diff output
+        with open(file1, 'rb') as f1:
+            content1 = f1.read().splitlines(keepends=True)
         
-        diff = []
-        for i, (line1, line2) in enumerate(zip(content1, content2)):
-            if line1 != line2:
-                diff.append(f"Line {i+1}:\n  File1: {line1.strip()}\n  File2: {line2.strip()}")
+        with open(file2, 'rb') as f2:
+            content2 = f2.read().splitlines(keepends=True)
         
-        # Handle different file lengths
-        if len(content1) > len(content2):
-            for i in range(len(content2), len(content1)):
-                diff.append(f"Line {i+1} (only in File1): {content1[i].strip()}")
-        elif len(content2) > len(content1):
-            for i in range(len(content1), len(content2)):
-                diff.append(f"Line {i+1} (only in File2): {content2[i].strip()}")
+        diff = b"".join(difflib.diff_bytes(
+            difflib.unified_diff, content1, content2,
+            fromfile=os.fsencode(file1), tofile=os.fsencode(file2), n=1
+        )).decode('utf-8', errors='replace')
         
         if not diff:
             return "Files are identical"
         
-        return f"Differences between {file1} and {file2}:\n" + "\n".join(diff)
+        return f"Differences between {file1} and {file2}:\n{diff}"
     except Exception as e:
         return f"Error comparing files: {str(e)}"
 
@@ -871,10 +1123,12 @@ def advanced_change_directory(path):
     
     path = os.path.abspath(path)
     
-    if not os.path.exists(path):
+    try:
+        st = os.stat(path)
+    except OSError:
         return f"Error: Path '{path}' does not exist."
     
-    if not os.path.isdir(path):
+    if not stat.S_ISDIR(st.st_mode):
         return f"Error: '{path}' is not a directory."
     
     # Update history
@@ -892,14 +1146,15 @@ def advanced_change_directory(path):
 def change_directory(path):
     """Change current directory"""
     global current_directory
-    
     try:
         path = os.path.abspath(path)
         
-        if not os.path.exists(path):
+        try:
+            st = os.stat(path)
+        except OSError:
             return f"Error: Path '{path}' does not exist."
         
-        if not os.path.isdir(path):
+        if not stat.S_ISDIR(st.st_mode):
             return f"Error: '{path}' is not a directory."
         
         os.chdir(path)
@@ -910,107 +1165,184 @@ def change_directory(path):
 
 def get_current_directory():
     """Get current directory"""
-    global current_directory
-    current_directory = os.getcwd()
     return f"Current directory: {current_directory}"
 
 # System Operations Functions
-def execute_system_command(command, timeout=30):
-    """Execute system command and return output"""
+# Only the tail of each output stream is kept (by line count and by bytes) so huge outputs
+# can't exhaust memory; longer lines are cut at _STREAM_LIMIT bytes
+_MAX_OUTPUT_LINES = 10_000
+_MAX_OUTPUT_BYTES = 4 << 20
+_STREAM_LIMIT = 1 << 16
+_LINE_TRUNCATED = b" ... [line truncated]\n"
+_OUTPUT_OMITTED = b"[... earlier output omitted ...]\n"
+
+async def _drain_stream(stream, sink) -> bool:
+    """Read a subprocess stream into a bounded deque of lines; return True if anything was dropped"""
+    size = 0
+    dropped = False
+    line = b""
+    overflow = False
+    while True:
+        chunk = await stream.read(_STREAM_LIMIT)
+        if not chunk:
+            break
+        start = 0
+        while start < len(chunk):
+            end = chunk.find(b"\n", start) + 1 or len(chunk)
+            if not overflow:
+                line += chunk[start:end]
+                if len(line) > _STREAM_LIMIT:
+                    # Keep the head of an oversized line and skip the rest up to its newline
+                    line = line[:_STREAM_LIMIT] + _LINE_TRUNCATED
+                    overflow = True
+            if chunk[end - 1:end] == b"\n":
+                if len(sink) == sink.maxlen:
+                    size -= len(sink[0])
+                    dropped = True
+                sink.append(line)
+                size += len(line)
+                while size > _MAX_OUTPUT_BYTES:
+                    size -= len(sink.popleft())
+                    dropped = True
+                line = b""
+                overflow = False
+            start = end
+    if line:
+        sink.append(line)
+    return dropped
+
+async def _communicate_bounded(proc, timeout):
+    """Wait for a subprocess, collecting stdout and stderr concurrently"""
+    stdout = collections.deque(maxlen=_MAX_OUTPUT_LINES)
+    stderr = collections.deque(maxlen=_MAX_OUTPUT_LINES)
+    try:
+        stdout_dropped, stderr_dropped, _ = await asyncio.wait_for(
+            asyncio.gather(_drain_stream(proc.stdout, stdout), _drain_stream(proc.stderr, stderr), proc.wait()),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    # Marked after draining: appendleft on a full deque would evict the last line
+    return (
+        proc.returncode,
+        ((_OUTPUT_OMITTED if stdout_dropped else b"") + b"".join(stdout)).decode('utf-8', errors='replace'),
+        ((_OUTPUT_OMITTED if stderr_dropped else b"") + b"".join(stderr)).decode('utf-8', errors='replace')
+    )
+
+async def execute_system_command_async(command, timeout=30):
+    """Execute system command without blocking the event loop and return output"""
     try:
         # Log the command
         console.print(f"[dim]Executing: {command}[/dim]")
         
         # Execute the command
-        result = subprocess.run(
+        proc = await asyncio.create_subprocess_shell(
             command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=_STREAM_LIMIT
         )
+        returncode, stdout, stderr = await _communicate_bounded(proc, timeout)
         
-        # Prepare the output
-        output = f"Command: {command}\n"
-        output += f"Return code: {result.returncode}\n"
+        # Prepare the output (joined once; stdout/stderr can be large)
+        parts = [f"Command: {command}\n", f"Return code: {returncode}\n"]
         
-        if result.stdout:
-            output += f"Stdout:\n{result.stdout}\n"
+        if stdout:
+            parts += ["Stdout:\n", stdout, "\n"]
         
-        if result.stderr:
-            output += f"Stderr:\n{result.stderr}\n"
+        if stderr:
+            parts += ["Stderr:\n", stderr, "\n"]
         
-        return output
-    except subprocess.TimeoutExpired:
+        return "".join(parts)
+    except asyncio.TimeoutError:
         return f"Command timed out after {timeout} seconds"
     except Exception as e:
         return f"Error executing command: {str(e)}"
 
-def git_operation(operation, *args):
-    """Execute git operations"""
+def execute_system_command(command, timeout=30):
+    """Execute system command and return output"""
+    return asyncio.run(execute_system_command_async(command, timeout))
+
+async def git_operation_async(operation, *args):
+    """Execute git operations without blocking the event loop"""
     try:
-        cmd = ["git", operation] + list(args)
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=60
+        proc = await asyncio.create_subprocess_exec(
+            "git", operation, *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=_STREAM_LIMIT
         )
+        returncode, stdout, stderr = await _communicate_bounded(proc, 60)
         
-        output = f"Git operation: git {operation} {' '.join(args)}\n"
-        output += f"Return code: {result.returncode}\n"
+        parts = [f"Git operation: git {operation} {' '.join(args)}\n", f"Return code: {returncode}\n"]
         
-        if result.stdout:
-            output += f"Output:\n{result.stdout}\n"
+        if stdout:
+            parts += ["Output:\n", stdout, "\n"]
         
-        if result.stderr:
-            output += f"Error:\n{result.stderr}\n"
+        if stderr:
+            parts += ["Error:\n", stderr, "\n"]
         
-        return output
-    except subprocess.TimeoutExpired:
+        return "".join(parts)
+    except asyncio.TimeoutError:
         return "Git operation timed out after 60 seconds"
     except Exception as e:
         return f"Error executing git operation: {str(e)}"
 
+def git_operation(operation, *args):
+    """Execute git operations"""
+    return asyncio.run(git_operation_async(operation, *args))
+
 # Project Analysis Functions
+# Hidden directories are skipped as well (see _scan_source_dir)
+_SKIP_DIRS = frozenset({'node_modules', '__pycache__', '.git', 'build', 'dist'})
+_SOURCE_EXTS = frozenset({'py', 'js', 'ts', 'java', 'cpp', 'c', 'h', 'cs', 'go', 'rs', 'rb', 'php', 'swift', 'kt', 'scala', 'html', 'css', 'json', 'xml', 'yaml', 'yml'})
+
+def _scan_source_dir(path, exts):
+    """Return (source file paths, subdirectories to descend into) from one os.scandir pass"""
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                name = entry.name
+                if entry.is_dir():
+                    # Skip hidden directories, common build directories and (like os.walk) symlinks
+                    if not name.startswith('.') and name not in _SKIP_DIRS and not entry.is_symlink():
+                        subdirs.append(entry.path)
+                # Check for common source file extensions by name alone, before any stat
+                else:
+                    _, dot, ext = name.rpartition('.')
+                    if dot and ext.lower() in exts:
+                        files.append(entry.path)
+    except OSError:
+        pass
+    return files, subdirs
+
+def _scandir_source_files(path, exts):
+    """Yield every source file path under path, in os.walk's top-down order"""
+    stack = [path]
+    while stack:
+        files, subdirs = _scan_source_dir(stack.pop(), exts)
+        yield from files
+        stack.extend(reversed(subdirs))
+
 def analyze_project_real():
     """Analyze the current directory project with real file access"""
-    current_dir = os.getcwd()
+    current_dir = current_directory
     
-    # Step 1: List directory contents
-    dir_contents = list_directory_contents_real(current_dir)
+    # Only names and counts are reported, so no file contents are read
     
-    # Step 2: Identify project type and key files
+    # Step 1: Identify project type and key files; one directory read answers every existence check
     project_files = ['package.json', 'requirements.txt', 'setup.py', 'pom.xml', 'Cargo.toml', 'go.mod', '.git']
-    found_files = []
-    
-    for file in project_files:
-        if os.path.exists(os.path.join(current_dir, file)):
-            found_files.append(file)
-    
-    # Step 3: Read key files if they exist
-    file_contents = {}
-    for file in found_files:
-        file_path = os.path.join(current_dir, file)
-        file_contents[file] = read_file_content_real(file_path)
-    
-    # Step 4: Analyze source code files
-    source_files = []
-    for root, dirs, files in os.walk(current_dir):
-        # Skip hidden directories and common build directories
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', '__pycache__', '.git', 'build', 'dist']]
-        
-        for file in files:
-            file_path = os.path.join(root, file)
-            # Check for common source file extensions
-            if file.endswith(('.py', '.js', '.ts', '.java', '.cpp', '.c', '.h', '.cs', '.go', 'rs', '.rb', '.php', '.swift', '.kt', '.scala', '.html', '.css', '.json', '.xml', '.yaml', '.yml')):
-                source_files.append(file_path)
+    with os.scandir(current_dir) as it:
+        top_level = {entry.name for entry in it}
+    found_files = [file for file in project_files if file in top_level]
     
-    # Step 5: Read a sample of source files for analysis
+    # Step 2: Find source code files
+    source_files = list(_scandir_source_files(current_dir, _SOURCE_EXTS))
     sample_files = source_files[:5]  # Limit to first 5 files for brevity
-    sample_contents = {}
-    for file_path in sample_files:
-        sample_contents[file_path] = read_file_content_real(file_path)
     
     # Update analysis state
     analysis_state["current_task"] = "Project analysis completed"
@@ -1036,7 +1368,7 @@ def track_tokens(operation_name: str, tokens_used: int):
     token_usage["operations"].append({
         "operation": operation_name,
         "tokens": tokens_used,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": time.time()
     })
     
     # Display token usage dynamically
@@ -1050,11 +1382,21 @@ def display_token_usage():
     table.add_column("Timestamp", style="green")
     
     for op in token_usage["operations"]:
-        table.add_row(op["operation"], str(op["tokens"]), op["timestamp"])
+        table.add_row(op["operation"], str(op["tokens"]), datetime.fromtimestamp(op["timestamp"]).isoformat())
     
     table.add_row("TOTAL", str(token_usage["total_tokens"]), "")
     console.print(table)
 
-def estimate_tokens(text):
-    """Estimate the number of tokens in a text"""
-    return len(text) // 4 + (1 if len(text) % 4 > 0 else 0)
\ No newline at end of file
+# Slash commands handled directly by the chat loop; a handler returning "exit" ends the session
+def _exit_session() -> str:
+    """Say goodbye and signal the chat loop to stop"""
+    console.print("[bold green]Session ended. Goodbye![/bold green]")
+    return "exit"
+
+COMMAND_HANDLERS: Dict[str, Callable[[], Optional[str]]] = {
+    "/exit": _exit_session,
+    "/help": show_help,
+    "/settings": show_settings,
+    "/tokens": display_token_usage,
+    "/configure": configure_provider,
+}
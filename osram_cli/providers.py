@@ -1,14 +1,193 @@
-import os
+import re
 import json
-from typing import Dict, Any, Generator
+import codecs
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from typing import Callable, Dict, Any, Generator, Iterator
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from rich.console import Console
 
+from .utils import json_loads, json_dumps, cache_get, cache_set, env_number
+
 console = Console()
 
-# List of available models per provider
+# Pooled HTTP sessions, one per provider, so consecutive calls reuse keep-alive connections
+_SESSIONS: Dict[str, requests.Session] = {}
+POOL_CONNECTIONS = env_number("OSRAM_POOL_CONNECTIONS", 4)
+POOL_MAXSIZE = env_number("OSRAM_POOL_MAXSIZE", 16)
+# (connect, read) timeouts in seconds; the read timeout bounds the wait between streamed chunks
+REQUEST_TIMEOUT = (
+    env_number("OSRAM_CONNECT_TIMEOUT", 5.0, float),
+    env_number("OSRAM_READ_TIMEOUT", 120.0, float)
+)
+
+# Provider calls are POSTs, which urllib3 does not retry by default. A chat completion has no
+# side effects, so it is safe to resend after a 429 or 5xx (honouring Retry-After). Once the
+# retries run out, the last response is returned for call_api to report.
+_RETRY_KWARGS = dict(
+    total=2,
+    backoff_factor=0.3,
+    status_forcelist=[429, 500, 502, 503, 504],
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+_RETRY_METHODS = frozenset({"HEAD", "GET", "POST"})
+
+def _build_retry() -> Retry:
+    """Retry policy for provider sessions"""
+    try:
+        return Retry(allowed_methods=_RETRY_METHODS, **_RETRY_KWARGS)
+    except TypeError:
+        # urllib3 < 1.26 names the option method_whitelist
+        return Retry(method_whitelist=_RETRY_METHODS, **_RETRY_KWARGS)
+
+def _build_session() -> requests.Session:
+    """Create a session with a keep-alive connection pool and retries"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=_build_retry()
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_session(provider_name: str) -> requests.Session:
+    """Return the pooled session for a provider, creating it on first use"""
+    session = _SESSIONS.get(provider_name)
+    if session is None:
+        session = _SESSIONS[provider_name] = _build_session()
+    return session
+
+def prewarm_session(provider_name: str, endpoint: str) -> None:
+    """Open a keep-alive connection to the provider's host in the background"""
+    # Only the origin is contacted, so no model name or API key from the endpoint is sent
+    parts = urlsplit(endpoint)
+    if not parts.scheme or not parts.netloc:
+        return
+    origin = f"{parts.scheme}://{parts.netloc}/"
+    session = get_session(provider_name)
+    
+    def _connect():
+        try:
+            # The TCP+TLS connection returns to the pool once the response is closed
+            session.head(origin, timeout=REQUEST_TIMEOUT[0], allow_redirects=False).close()
+        except requests.exceptions.RequestException:
+            pass
+    
+    threading.Thread(target=_connect, name="osram-prewarm", daemon=True).start()
+
+# Replies to temperature-0 requests are cached (when "cache_responses" is enabled) for this many seconds
+RESPONSE_CACHE_TTL = env_number("OSRAM_RESPONSE_CACHE_TTL", 3600)
+
+def _is_deterministic(body: Dict[str, Any]) -> bool:
+    """True when a request body pins temperature to 0; sampled replies are never cached"""
+    for section in (body, body.get("generationConfig"), body.get("parameters")):
+        if isinstance(section, dict) and "temperature" in section:
+            return section["temperature"] == 0
+    # No temperature set: the provider samples with its own default
+    return False
+
+def _response_cache_key(provider_name: str, url: str, data: bytes) -> str:
+    """Hash the provider, endpoint and serialized request body (model, messages, sampling) into a cache key"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{provider_name}\0{url}\0".encode("utf-8"))
+    h.update(data)
+    return h.hexdigest()
+
+def _cache_stream(stream: Iterator[str], key: str) -> Generator[str, None, None]:
+    """Pass a reply stream through, caching the full text once it has been consumed"""
+    parts = []
+    for chunk in stream:
+        parts.append(chunk)
+        yield chunk
+    if parts:
+        cache_set(key, "".join(parts), RESPONSE_CACHE_TTL)
+
+# Streaming: read the socket in large chunks and match SSE framing on raw bytes
+STREAM_CHUNK_SIZE = 65536
+SSE_DATA_PREFIX = b"data: "
+SSE_DONE = b"[DONE]"
+
+def iter_sse_data(response: requests.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Generator[bytes, None, None]:
+    """Yield the payload of every SSE "data:" line, framing raw chunks in a rolling buffer"""
+    prefix_len = len(SSE_DATA_PREFIX)
+    buf = bytearray()
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        buf += chunk
+        start = 0
+        # Slice lines out of the buffer without copying them; only payloads become bytes
+        with memoryview(buf) as view:
+            while True:
+                end = buf.find(b"\n", start)
+                if end < 0:
+                    break
+                with view[start:end] as line:
+                    payload = bytes(line[prefix_len:]).strip() if line[:prefix_len] == SSE_DATA_PREFIX else None
+                start = end + 1
+                # Skip non-data lines, empty data and [DONE] markers
+                if payload and payload != SSE_DONE:
+                    yield payload
+        del buf[:start]
+    # A final line without a trailing newline
+    if buf.startswith(SSE_DATA_PREFIX):
+        payload = bytes(buf[prefix_len:]).strip()
+        if payload and payload != SSE_DONE:
+            yield payload
+
+def iter_raw_lines(response: requests.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Generator[bytes, None, None]:
+    """Yield every non-blank line of a streamed body, framing raw chunks in a rolling buffer"""
+    buf = bytearray()
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        buf += chunk
+        start = 0
+        with memoryview(buf) as view:
+            while True:
+                end = buf.find(b"\n", start)
+                if end < 0:
+                    break
+                with view[start:end] as line:
+                    payload = bytes(line).strip()
+                start = end + 1
+                if payload:
+                    yield payload
+        del buf[:start]
+    # A final line without a trailing newline
+    payload = bytes(buf).strip()
+    if payload:
+        yield payload
+
+# Whitespace and array punctuation between the values of a streamed JSON array
+_JSON_SEPARATORS = re.compile(r'[\s\[\],]*')
+
+def iter_json_values(response: requests.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Generator[Any, None, None]:
+    """Yield each element of a streamed JSON array (or each of several concatenated values) once it is complete"""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")("replace")
+    skip = _JSON_SEPARATORS.match
+    buf = ""
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        buf += utf8.decode(chunk)
+        pos = 0
+        while True:
+            pos = skip(buf, pos).end()
+            if pos >= len(buf):
+                break
+            try:
+                value, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Incomplete value: wait for the next chunk
+                break
+            yield value
+        buf = buf[pos:]
+
+# Available models per provider (immutable tuples, in display order)
 AVAILABLE_MODELS = {
-    "zai": [
+    "zai": (
         "GLM-4.5",
         "GLM-4-Plus",
         "GLM-4.5-X",
@@ -25,8 +204,8 @@ AVAILABLE_MODELS = {
         "CogVideoX-3",
         "GLM-4.5V",
         "Vidu 2"
-    ],
-    "claude": [
+    ),
+    "claude": (
         "claude-3-opus-20240229",
         "claude-3-sonnet-20240229",
         "claude-3-haiku-20240307",
@@ -36,15 +215,15 @@ AVAILABLE_MODELS = {
         "claude-3-7-sonnet-20250219",
         "claude-3-5-sonnet-20241022",
         "claude-3-5-haiku-20241022"
-    ],
-    "gemini": [
+    ),
+    "gemini": (
         "gemini-1.5-pro-latest",
         "gemini-1.5-flash-latest",
         "gemini-1.0-pro-latest",
         "gemini-2.5-flash",
         "gemini-2.5-pro"
-    ],
-    "openai": [
+    ),
+    "openai": (
         "gpt-4-turbo",
         "gpt-4",
         "gpt-3.5-turbo",
@@ -52,8 +231,8 @@ AVAILABLE_MODELS = {
         "gpt-4o-mini",
         "gpt-o3-2025-04-16",
         "gpt-5-2025-08-07"
-    ],
-    "qwen": [
+    ),
+    "qwen": (
         "Qwen3-Coder",
         "Qwen3-235B-A22B",
         "Qwen3-30B-A3B",
@@ -67,15 +246,79 @@ AVAILABLE_MODELS = {
         "qwen-plus",
         "qwen-max",
         "qwen-max-longcontext"
-    ]
+    )
 }
 
+# Hashed model lookup per provider for O(1) validation
+AVAILABLE_MODELS_SET = {provider: frozenset(models) for provider, models in AVAILABLE_MODELS.items()}
+
+# Per-provider extraction of the text delta from one parsed stream event; direct indexing
+# with one exception handler avoids building throwaway default dicts for every event
+_EXTRACT_ERRORS = (KeyError, IndexError, TypeError)
+
+def _extract_openai_delta(data: Dict[str, Any]) -> str:
+    """Zhipu and OpenAI chat-completions chunks"""
+    try:
+        return data["choices"][0]["delta"]["content"]
+    except _EXTRACT_ERRORS:
+        return ""
+
+def _extract_anthropic_delta(data: Dict[str, Any]) -> str:
+    """Anthropic messages events"""
+    try:
+        return data["delta"]["text"] if data["type"] == "content_block_delta" else ""
+    except _EXTRACT_ERRORS:
+        return ""
+
+def _extract_gemini_text(data: Dict[str, Any]) -> str:
+    """Gemini streamGenerateContent objects"""
+    try:
+        return data["candidates"][0]["content"]["parts"][0]["text"]
+    except _EXTRACT_ERRORS:
+        return ""
+
+def _extract_qwen_content(data: Dict[str, Any]) -> str:
+    """DashScope generation objects"""
+    try:
+        return data["output"]["choices"][0]["message"]["content"]
+    except _EXTRACT_ERRORS:
+        return ""
+
+# Deltas are often a few characters each; hand them out in batches of at least this many
+STREAM_BATCH_CHARS = 64
+
+def _parse_json_stream(lines: Iterator[Any], extract: Callable[[Dict[str, Any]], str], loads=json_loads) -> Generator[str, None, None]:
+    """Parse each raw JSON line (loads=None: already parsed) and yield the text extract finds, in batches"""
+    parts = []
+    size = 0
+    for data in lines:
+        if loads is not None:
+            try:
+                data = loads(data)
+            except ValueError:
+                # Skip invalid JSON (or non-UTF-8) lines
+                continue
+        content = extract(data)
+        if content:
+            parts.append(content)
+            size += len(content)
+            # Flush at line ends too, so output never lags by more than a line
+            if size >= STREAM_BATCH_CHARS or "\n" in content:
+                yield "".join(parts)
+                parts.clear()
+                size = 0
+    if parts:
+        yield "".join(parts)
+
 class BaseProvider:
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.api_key = config["api_key"]
         self.model = config["model"]
         self.endpoint = config["endpoint"]
+        # Both only depend on the configuration, so they are built once per instance
+        self.headers = self.prepare_headers()
+        self.url = self.endpoint.format(model=self.model, api_key=self.api_key)
     
     def prepare_headers(self) -> Dict[str, str]:
         raise NotImplementedError
@@ -83,7 +326,7 @@ class BaseProvider:
     def prepare_body(self, messages: list) -> Dict[str, Any]:
         raise NotImplementedError
     
-    def parse_stream(self, response: requests.Response) -> Generator[str, None, None]:
+    def parse_stream(self, response: requests.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Generator[str, None, None]:
         raise NotImplementedError
 
 class ZhipuProvider(BaseProvider):
@@ -100,24 +343,8 @@ class ZhipuProvider(BaseProvider):
             "stream": True
         }
     
-    def parse_stream(self, response: requests.Response) -> Generator[str, None, None]:
-        for line in response.iter_lines():
-            if line:
-                decoded = line.decode('utf-8')
-                if decoded.startswith("data: "):
-                    data_str = decoded[6:]
-                    # Skip empty data or [DONE] markers
-                    if not data_str or data_str.strip() == "[DONE]":
-                        continue
-                    try:
-                        data = json.loads(data_str)
-                        if "choices" in data and data["choices"]:
-                            content = data["choices"][0].get("delta", {}).get("content", "")
-                            if content:
-                                yield content
-                    except json.JSONDecodeError:
-                        # Skip invalid JSON lines
-                        continue
+    def parse_stream(self, response: requests.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Generator[str, None, None]:
+        return _parse_json_stream(iter_sse_data(response, chunk_size), _extract_openai_delta)
 
 class AnthropicProvider(BaseProvider):
     def prepare_headers(self) -> Dict[str, str]:
@@ -131,24 +358,13 @@ class AnthropicProvider(BaseProvider):
         return {
             "model": self.model,
             "max_tokens": 4096,
-            "messages": [{"role": msg["role"], "content": msg["content"]} for msg in messages],
+            # Chat messages only ever carry "role" and "content", so they are sent as-is
+            "messages": messages,
             "stream": True
         }
     
-    def parse_stream(self, response: requests.Response) -> Generator[str, None, None]:
-        for line in response.iter_lines():
-            if line:
-                decoded = line.decode('utf-8')
-                if decoded.startswith("data: "):
-                    try:
-                        data = json.loads(decoded[6:])
-                        if data.get("type") == "content_block_delta":
-                            content = data.get("delta", {}).get("text", "")
-                            if content:
-                                yield content
-                    except json.JSONDecodeError:
-                        # Skip invalid JSON lines
-                        continue
+    def parse_stream(self, response: requests.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Generator[str, None, None]:
+        return _parse_json_stream(iter_sse_data(response, chunk_size), _extract_anthropic_delta)
 
 class GoogleProvider(BaseProvider):
     def prepare_headers(self) -> Dict[str, str]:
@@ -172,19 +388,9 @@ class GoogleProvider(BaseProvider):
             }
         }
     
-    def parse_stream(self, response: requests.Response) -> Generator[str, None, None]:
-        for line in response.iter_lines():
-            if line:
-                decoded = line.decode('utf-8')
-                try:
-                    data = json.loads(decoded)
-                    if "candidates" in data and data["candidates"]:
-                        content = data["candidates"][0].get("content", {}).get("parts", [{}])[0].get("text", "")
-                        if content:
-                            yield content
-                except json.JSONDecodeError:
-                    # Skip invalid JSON lines
-                    continue
+    def parse_stream(self, response: requests.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Generator[str, None, None]:
+        # streamGenerateContent sends one JSON array whose elements span several lines
+        return _parse_json_stream(iter_json_values(response, chunk_size), _extract_gemini_text, loads=None)
 
 class OpenAIProvider(BaseProvider):
     def prepare_headers(self) -> Dict[str, str]:
@@ -200,24 +406,8 @@ class OpenAIProvider(BaseProvider):
             "stream": True
         }
     
-    def parse_stream(self, response: requests.Response) -> Generator[str, None, None]:
-        for line in response.iter_lines():
-            if line:
-                decoded = line.decode('utf-8')
-                if decoded.startswith("data: "):
-                    data_str = decoded[6:]
-                    # Skip empty data or [DONE] markers
-                    if not data_str or data_str.strip() == "[DONE]":
-                        continue
-                    try:
-                        data = json.loads(data_str)
-                        if "choices" in data and data["choices"]:
-                            content = data["choices"][0].get("delta", {}).get("content", "")
-                            if content:
-                                yield content
-                    except json.JSONDecodeError:
-                        # Skip invalid JSON lines
-                        continue
+    def parse_stream(self, response: requests.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Generator[str, None, None]:
+        return _parse_json_stream(iter_sse_data(response, chunk_size), _extract_openai_delta)
 
 class QwenProvider(BaseProvider):
     def prepare_headers(self) -> Dict[str, str]:
@@ -237,19 +427,8 @@ class QwenProvider(BaseProvider):
             }
         }
     
-    def parse_stream(self, response: requests.Response) -> Generator[str, None, None]:
-        for line in response.iter_lines():
-            if line:
-                decoded = line.decode('utf-8')
-                try:
-                    data = json.loads(decoded)
-                    if "output" in data and "choices" in data["output"]:
-                        content = data["output"]["choices"][0].get("message", {}).get("content", "")
-                        if content:
-                            yield content
-                except json.JSONDecodeError:
-                    # Skip invalid JSON lines
-                    continue
+    def parse_stream(self, response: requests.Response, chunk_size: int = STREAM_CHUNK_SIZE) -> Generator[str, None, None]:
+        return _parse_json_stream(iter_raw_lines(response, chunk_size), _extract_qwen_content)
 
 PROVIDERS = {
     "zai": ZhipuProvider,
@@ -259,6 +438,17 @@ PROVIDERS = {
     "qwen": QwenProvider
 }
 
+# Provider instances, reused while their configuration is unchanged
+_PROVIDER_INSTANCES: Dict[tuple, BaseProvider] = {}
+
+def get_provider(provider_name: str, provider_config: Dict[str, Any]) -> BaseProvider:
+    """Return a provider instance for this exact configuration, creating it on first use"""
+    key = (provider_name, provider_config["api_key"], provider_config["model"], provider_config["endpoint"])
+    provider = _PROVIDER_INSTANCES.get(key)
+    if provider is None:
+        provider = _PROVIDER_INSTANCES[key] = PROVIDERS[provider_name](provider_config)
+    return provider
+
 def call_api(messages, provider_name=None, model_name=None, temperature=None, max_tokens=None):
     """Call AI API with the specified provider"""
     from .utils import load_config
@@ -284,26 +474,37 @@ def call_api(messages, provider_name=None, model_name=None, temperature=None, ma
         console.print(f"[red]Provider '{provider_name}' not implemented[/red]")
         return None
     
-    # Create provider instance
-    provider = provider_class(provider_config)
+    # Get the provider instance (headers and URL are prepared once per configuration)
+    provider = get_provider(provider_name, provider_config)
     
-    # Format endpoint with variables if needed
-    endpoint = provider.endpoint.format(
-        model=provider.model,
-        api_key=provider.api_key
-    )
+    # Every provider sets Content-Type itself, so the body is serialized here
+    body = provider.prepare_body(messages)
+    data = json_dumps(body).encode("utf-8")
+    
+    # Serve an identical earlier deterministic request from the response cache
+    cache_key = None
+    if config.get("cache_responses") and _is_deterministic(body):
+        cache_key = _response_cache_key(provider_name, provider.url, data)
+        cached = cache_get(cache_key)
+        if cached is not None:
+            return iter((cached,))
     
     try:
-        response = requests.post(
-            endpoint,
-            headers=provider.prepare_headers(),
-            json=provider.prepare_body(messages),
-            stream=True
+        # Headers are merged with the session defaults, keeping "Connection: keep-alive"
+        response = get_session(provider_name).post(
+            provider.url,
+            headers=provider.headers,
+            data=data,
+            stream=True,
+            timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
+        # Let urllib3 undo any gzip/deflate transfer encoding in C
+        response.raw.decode_content = True
         
         # Return the streaming response
-        return provider.parse_stream(response)
+        stream = provider.parse_stream(response, chunk_size=STREAM_CHUNK_SIZE)
+        return _cache_stream(stream, cache_key) if cache_key else stream
         
     except requests.exceptions.RequestException as e:
         console.print(f"[red]API Error: {str(e)}[/red]")
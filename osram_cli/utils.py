@@ -1,79 +1,144 @@
 import os
 import json
 import sqlite3
-import re
+import threading
+import copy
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from rich.console import Console
 
+# Optional C-accelerated JSON (pip install osram-cli[speedups])
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 console = Console()
 
+def json_loads(data) -> Any:
+    """Parse JSON from bytes or str, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj: Any) -> str:
+    """Serialize obj to a JSON string, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+    return json.dumps(obj, default=str)
+
+def env_number(name: str, default, cast=int):
+    """Read a numeric OSRAM_* setting from the environment, warning and using default if it is malformed"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        console.print(f"[yellow]Ignoring invalid {name}={value!r}; using {default}[/yellow]")
+        return default
+
+# Configuration written on first run; copied, never handed out directly
+_DEFAULT_CONFIG = {
+    "current_provider": "zai",
+    "providers": {
+        "zai": {
+            "api_key": "",
+            "model": "GLM-4-Plus",
+            "endpoint": "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+        },
+        "claude": {
+            "api_key": "",
+            "model": "claude-3-opus-20240229",
+            "endpoint": "https://api.anthropic.com/v1/messages"
+        },
+        "gemini": {
+            "api_key": "",
+            "model": "gemini-1.5-pro-latest",
+            "endpoint": "https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?key={api_key}"
+        },
+        "openai": {
+            "api_key": "",
+            "model": "gpt-4-turbo",
+            "endpoint": "https://api.openai.com/v1/chat/completions"
+        },
+        "qwen": {
+            "api_key": "",
+            "model": "Qwen3-Coder",
+            "endpoint": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+        }
+    },
+    "temperature": 0.7,
+    "max_tokens": 4096,
+    "save_history": True,
+    "history_file": "osram_history.json",
+    "trust_current_directory": False,
+    "history_per_directory": True,
+    "auto_approve_file_operations": False,
+    "persistent_analysis": True,
+    "enable_plugins": True,
+    "enable_git_integration": True,
+    "enable_collaboration": False,
+    "enable_streaming": True,
+    "cache_responses": False,
+    "log_operations": True,
+    "user_preferences": {
+        "theme": "dark",
+        "font_size": 14,
+        "auto_save": True,
+        "confirm_destructive": True,
+        "streaming": True,
+        "max_history": 1000,
+        "preferred_language": "python",
+        "key_bindings": None
+    }
+}
+
+# (st_mtime_ns, st_size, config) of the last parsed config file
+_CONFIG_CACHE: Optional[Tuple[int, int, Dict[str, Any]]] = None
+
 def load_config() -> Dict[str, Any]:
-    """Load configuration from file"""
+    """Load configuration, reparsing the file only when its mtime or size changed.
+
+    The returned dict is shared between callers and must not be modified: callers that
+    change settings work on a copy.deepcopy of it and persist that with save_config.
+    """
+    global _CONFIG_CACHE
     config_path = Path.home() / ".osram_config.json"
     
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        st = None
+    if st is not None and _CONFIG_CACHE is not None and _CONFIG_CACHE[:2] == (st.st_mtime_ns, st.st_size):
+        return _CONFIG_CACHE[2]
+    
+    config = _load_config_uncached(config_path)
+    if config:
+        try:
+            st = os.stat(config_path)
+            _CONFIG_CACHE = (st.st_mtime_ns, st.st_size, config)
+        except OSError:
+            _CONFIG_CACHE = None
+    return config
+
+def invalidate_config_cache():
+    """Drop the cached configuration so the next load_config rereads the file"""
+    global _CONFIG_CACHE
+    _CONFIG_CACHE = None
+
+def _load_config_uncached(config_path: Path) -> Dict[str, Any]:
+    """Load configuration from file"""
+    
     if not config_path.exists():
         # Create default config
-        config = {
-            "current_provider": "zai",
-            "providers": {
-                "zai": {
-                    "api_key": "",
-                    "model": "GLM-4-Plus",
-                    "endpoint": "https://open.bigmodel.cn/api/paas/v4/chat/completions"
-                },
-                "claude": {
-                    "api_key": "",
-                    "model": "claude-3-opus-20240229",
-                    "endpoint": "https://api.anthropic.com/v1/messages"
-                },
-                "gemini": {
-                    "api_key": "",
-                    "model": "gemini-1.5-pro-latest",
-                    "endpoint": "https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?key={api_key}"
-                },
-                "openai": {
-                    "api_key": "",
-                    "model": "gpt-4-turbo",
-                    "endpoint": "https://api.openai.com/v1/chat/completions"
-                },
-                "qwen": {
-                    "api_key": "",
-                    "model": "Qwen3-Coder",
-                    "endpoint": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
-                }
-            },
-            "temperature": 0.7,
-            "max_tokens": 4096,
-            "save_history": True,
-            "history_file": "osram_history.json",
-            "trust_current_directory": False,
-            "history_per_directory": True,
-            "auto_approve_file_operations": False,
-            "persistent_analysis": True,
-            "enable_plugins": True,
-            "enable_git_integration": True,
-            "enable_collaboration": False,
-            "enable_streaming": True,
-            "cache_responses": True,
-            "log_operations": True,
-            "user_preferences": {
-                "theme": "dark",
-                "font_size": 14,
-                "auto_save": True,
-                "confirm_destructive": True,
-                "streaming": True,
-                "max_history": 1000,
-                "preferred_language": "python",
-                "key_bindings": None
-            }
-        }
+        config = copy.deepcopy(_DEFAULT_CONFIG)
         save_config(config)
         return config
     
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        with open(config_path, 'rb') as f:
+            config = json_loads(f.read())
         
         # Ensure backward compatibility
         if "providers" not in config:
@@ -91,26 +156,9 @@ def load_config() -> Dict[str, Any]:
             config["current_provider"] = "zai"
             
             # Add other providers with empty keys
-            config["providers"]["claude"] = {
-                "api_key": "",
-                "model": "claude-3-opus-20240229",
-                "endpoint": "https://api.anthropic.com/v1/messages"
-            }
-            config["providers"]["gemini"] = {
-                "api_key": "",
-                "model": "gemini-1.5-pro-latest",
-                "endpoint": "https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?key={api_key}"
-            }
-            config["providers"]["openai"] = {
-                "api_key": "",
-                "model": "gpt-4-turbo",
-                "endpoint": "https://api.openai.com/v1/chat/completions"
-            }
-            config["providers"]["qwen"] = {
-                "api_key": "",
-                "model": "Qwen3-Coder",
-                "endpoint": "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
-            }
+            for name, provider in _DEFAULT_CONFIG["providers"].items():
+                if name != "zai":
+                    config["providers"][name] = dict(provider)
             
             save_config(config)
         
@@ -122,12 +170,17 @@ def load_config() -> Dict[str, Any]:
 def save_config(config: Dict[str, Any]) -> bool:
     """Save configuration to file"""
     config_path = Path.home() / ".osram_config.json"
+    invalidate_config_cache()
     try:
         config_path.parent.mkdir(exist_ok=True)
         
-        # Write config file
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        # Write config file (kept indented: users edit it by hand)
+        if orjson is not None:
+            data = orjson.dumps(config, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(config, indent=2).encode("utf-8")
+        with open(config_path, 'wb') as f:
+            f.write(data)
         
         # Set secure permissions (read/write for owner only)
         os.chmod(config_path, 0o600)
@@ -137,15 +190,39 @@ def save_config(config: Dict[str, Any]) -> bool:
         console.print(f"[red]Error saving configuration: {str(e)}[/red]")
         return False
 
-def setup_database():
+# Shared SQLite connection, opened lazily on first database use
+_DB_CONN: Optional[sqlite3.Connection] = None
+_DB_LOCK = threading.Lock()
+_DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+)
+
+def get_db_connection() -> sqlite3.Connection:
+    """Return the shared database connection, creating the database on first use"""
+    global _DB_CONN
+    if _DB_CONN is None:
+        with _DB_LOCK:
+            if _DB_CONN is None:
+                _DB_CONN = setup_database()
+    return _DB_CONN
+
+def setup_database() -> sqlite3.Connection:
     """Setup SQLite database for caching and history"""
     db_path = Path.home() / ".osram_cli" / "osram_cli.db"
     db_path.parent.mkdir(exist_ok=True)
     
-    conn = sqlite3.connect(str(db_path))
+    # sqlite3 keeps an LRU of prepared statements per connection; reusing it keeps them warm
+    conn = sqlite3.connect(str(db_path), check_same_thread=False, cached_statements=256)
+    for pragma in _DB_PRAGMAS:
+        conn.execute(pragma)
     cursor = conn.cursor()
     
-    # Create tables
+    # Create tables (and indexes) in one transaction: one journal sync instead of one per statement
+    cursor.execute("BEGIN")
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS cache (
         key TEXT PRIMARY KEY,
@@ -166,6 +243,8 @@ def setup_database():
         details TEXT
     )
     ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_operations_log_session ON operations_log (session_id, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires_at)")
     
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS project_analysis (
@@ -176,7 +255,31 @@ def setup_database():
     ''')
     
     conn.commit()
-    conn.close()
+    return conn
+
+def cache_get(key: str) -> Optional[str]:
+    """Return an unexpired cached value, or None"""
+    try:
+        row = get_db_connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > datetime('now')", (key,)
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+def cache_set(key: str, value: str, ttl_seconds: int) -> bool:
+    """Store a value in the cache for ttl_seconds"""
+    try:
+        conn = get_db_connection()
+        with _DB_LOCK, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, timestamp, expires_at) "
+                "VALUES (?, ?, datetime('now'), datetime('now', ?))",
+                (key, value, f"+{int(ttl_seconds)} seconds")
+            )
+        return True
+    except sqlite3.Error:
+        return False
 
 def get_current_provider():
     """Get current provider configuration"""
@@ -184,22 +287,56 @@ def get_current_provider():
     provider_name = config.get("current_provider", "zai")
     return provider_name, config["providers"].get(provider_name, {})
 
+# Texts longer than this skip the tokenizer and use the length heuristic
+_TOKENIZER_MAX_CHARS = 64 * 1024
+
+# tiktoken encoding, set by a background thread once loaded (it may be downloaded on first use)
+_TOKEN_ENCODING = None
+_TOKEN_ENCODING_LOADER: Optional[threading.Thread] = None
+_TOKEN_ENCODING_LOCK = threading.Lock()
+
+def _load_token_encoding():
+    """Load the tiktoken encoding into _TOKEN_ENCODING"""
+    global _TOKEN_ENCODING
+    try:
+        import tiktoken
+        _TOKEN_ENCODING = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Not installed, or the encoding could not be loaded (e.g. offline on first use)
+        pass
+
+def _get_token_encoding():
+    """Return the tiktoken encoding, or None while it is loading or unavailable"""
+    global _TOKEN_ENCODING_LOADER
+    if _TOKEN_ENCODING_LOADER is None:
+        with _TOKEN_ENCODING_LOCK:
+            if _TOKEN_ENCODING_LOADER is None:
+                _TOKEN_ENCODING_LOADER = threading.Thread(target=_load_token_encoding, name="osram-tokenizer", daemon=True)
+                _TOKEN_ENCODING_LOADER.start()
+    return _TOKEN_ENCODING
+
 def estimate_tokens(text):
-    """Estimate the number of tokens in a text"""
-    return len(text) // 4 + (1 if len(text) % 4 > 0 else 0)
+    """Estimate the number of tokens in a text, exactly once the tiktoken encoding has loaded"""
+    length = len(text)
+    if length <= _TOKENIZER_MAX_CHARS:
+        encoding = _get_token_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+    # ceil(length / 4)
+    return (length + 3) >> 2
+
+def estimate_tokens_batch(texts) -> int:
+    """Estimate the total number of tokens in several texts without concatenating them"""
+    return sum(map(estimate_tokens, texts))
 
 def validate_model(provider_name: str, model_name: str) -> bool:
     """Validate if a model is available for a provider"""
-    from .providers import AVAILABLE_MODELS
+    from .providers import AVAILABLE_MODELS_SET
     
-    if provider_name not in AVAILABLE_MODELS:
-        return False
-    return model_name in AVAILABLE_MODELS[provider_name]
+    return model_name in AVAILABLE_MODELS_SET.get(provider_name, ())
 
 def get_available_models(provider_name: str) -> List[str]:
     """Return the list of available models for a provider"""
     from .providers import AVAILABLE_MODELS
     
-    if provider_name in AVAILABLE_MODELS:
-        return AVAILABLE_MODELS[provider_name]
-    return []
\ No newline at end of file
+    return list(AVAILABLE_MODELS.get(provider_name, ()))
\ No newline at end of file
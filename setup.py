@@ -25,6 +25,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/Volgat/osram-cli",
     packages=find_packages(),
+    package_data={"osram_cli": ["logo.txt"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -37,6 +38,10 @@ setup(
         "rich>=10.0.0",
         "prompt-toolkit>=3.0.0",
     ],
+    extras_require={
+        "speedups": ["orjson>=3.0.0", "blake3>=0.3.0"],
+        "tokenizer": ["tiktoken>=0.5.0"],
+    },
     entry_points={
         "console_scripts": [
             "osram=osram_cli.__main__:main",  # call  function main